@@ -53,11 +53,11 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
+    # Answer unhandled errors with the JSON 500 handler instead of re-raising
+    PROPAGATE_EXCEPTIONS = False
+    # Must be set in the environment; checked by get_config() so importing
+    # this module works in every environment
     SECRET_KEY = os.environ.get('SECRET_KEY')
-    
-    # Ensure secret key is set in production
-    if not SECRET_KEY:
-        raise ValueError("SECRET_KEY environment variable must be set in production")
 
 
 class TestingConfig(Config):
@@ -81,5 +81,13 @@ config = {
 
 
 def get_config():
-    """Get configuration based on environment"""
-    return config[os.environ.get('FLASK_ENV', 'default')]
\ No newline at end of file
+    """
+    Get configuration based on environment
+    
+    Raises:
+        ValueError: If production is selected without SECRET_KEY set
+    """
+    config_class = config[os.environ.get('FLASK_ENV', 'default')]
+    if config_class is ProductionConfig and not config_class.SECRET_KEY:
+        raise ValueError("SECRET_KEY environment variable must be set in production")
+    return config_class
\ No newline at end of file
@@ -3,43 +3,141 @@ E-commerce Store API
 Main Flask application with cart and checkout functionality
 """
 
-from flask import Flask, request, jsonify
-from datetime import datetime
+from flask import Flask, Response, abort, g, request
+from flask.json.provider import JSONProvider
 import uuid
 from typing import Dict, List, Optional
 import logging
+import os
+import time
+import orjson
 from flask_cors import CORS
+from flask_compress import Compress
 
-from models import InMemoryStore, Cart, Order, Item, DiscountCode
+from models import (InMemoryStore, Cart, Order, Item, DiscountCode, now_ns, set_request_time,
+                    reset_request_time, timestamp_to_datetime)
 from services import CartService, OrderService, DiscountService, AdminService
 from validators import validate_add_item_request, validate_checkout_request
 
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (compact output, no key sorting)"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize obj to a JSON string"""
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes"""
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+# run_script.py exports FLASK_ENV before starting gunicorn, so every worker
+# that imports this module loads the same environment settings
+if os.environ.get('FLASK_ENV'):
+    from config import get_config
+    app.config.from_object(get_config())
+# Parse request bodies and serialize any Flask-generated JSON with orjson
+app.json = ORJSONProvider(app)
+# Reject oversized request bodies before they are parsed
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024
+app.url_map.strict_slashes = False
 CORS(app,
      origins=["https://uniblox-ten.vercel.app"],
      supports_credentials=True,
      allow_headers=["Content-Type", "Authorization"],
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH", "HEAD"])
 
+# Compress JSON responses (brotli preferred, gzip fallback)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 500
+app.config['COMPRESS_LEVEL'] = 4
+Compress(app)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize services
-store = InMemoryStore()
-cart_service = CartService(store)
-order_service = OrderService(store)
-discount_service = DiscountService(store)
-admin_service = AdminService(store)
+# Initialize store; services are created on first use
+store = InMemoryStore.instance()
+_SERVICE_CLASSES = {
+    'cart_service': CartService,
+    'order_service': OrderService,
+    'discount_service': DiscountService,
+    'admin_service': AdminService
+}
+_services: Dict[str, object] = {}
+
+
+def _get_service(name: str):
+    """Get a service bound to the shared store, creating it on first access"""
+    service = _services.get(name)
+    if service is None:
+        service = _services.setdefault(name, _SERVICE_CLASSES[name](store))
+    return service
+
+
+def __getattr__(name: str):
+    """Expose services as lazily created module attributes (PEP 562)"""
+    if name in _SERVICE_CLASSES:
+        return _get_service(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Configuration
 DISCOUNT_ORDER_FREQUENCY = 3  # Every 3rd order gets a discount code
 
 
+def ojsonify(obj) -> Response:
+    """
+    Serialize obj to a JSON response using orjson
+
+    Datetimes are left to orjson, so model to_dict() outputs can be passed
+    through without formatting timestamps in Python.
+    """
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
+def _read_json_body():
+    """
+    Parse the request body as JSON, telling a missing body from a broken one
+    
+    Returns:
+        Tuple of (data, error_message); data is None when no body was sent
+    """
+    data = request.get_json(silent=True)
+    if data is None and request.get_data(cache=True).strip() not in (b'', b'null'):
+        return None, "Request body must be valid JSON"
+    return data, None
+
+
+@app.before_request
+def reject_oversized_body():
+    """Reject bodies over MAX_CONTENT_LENGTH before a route tries to parse them"""
+    content_length = request.content_length
+    if content_length is not None and content_length > app.config['MAX_CONTENT_LENGTH']:
+        abort(413)
+
+
+@app.before_request
+def stamp_request_time():
+    """Read the clock once per request and share it with the models"""
+    g.request_time_token = set_request_time(time.time_ns())
+
+
+@app.teardown_request
+def clear_request_time(error=None):
+    """Drop the request's clock snapshot"""
+    token = g.pop('request_time_token', None)
+    if token is not None:
+        reset_request_time(token)
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()})
+    return ojsonify({"status": "healthy", "timestamp": timestamp_to_datetime(now_ns())})
 
 
 @app.route('/cart/<user_id>/items', methods=['POST'])
@@ -55,13 +153,15 @@ def add_item_to_cart(user_id: str):
         "quantity": int
     }
     """
+    cart_service = _get_service('cart_service')
     try:
         # Validate request data
-        validation_error = validate_add_item_request(request.json)
+        data, validation_error = _read_json_body()
+        if not validation_error:
+            validation_error = validate_add_item_request(data)
         if validation_error:
-            return jsonify({"error": validation_error}), 400
+            return ojsonify({"error": validation_error}), 400
         
-        data = request.json
         item = Item(
             item_id=data['item_id'],
             name=data['name'],
@@ -71,29 +171,30 @@ def add_item_to_cart(user_id: str):
         
         cart = cart_service.add_item_to_cart(user_id, item)
         
-        logger.info(f"Item {item.item_id} added to cart for user {user_id}")
+        logger.info("Item %s added to cart for user %s", item.item_id, user_id)
         
-        return jsonify({
+        return ojsonify({
             "message": "Item added to cart successfully",
             "cart": cart.to_dict()
         }), 200
         
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return ojsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error adding item to cart: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        logger.error("Error adding item to cart: %s", e)
+        return ojsonify({"error": "Internal server error"}), 500
 
 
 @app.route('/cart/<user_id>', methods=['GET'])
 def get_cart(user_id: str):
     """Get user's current cart"""
+    cart_service = _get_service('cart_service')
     try:
         cart = cart_service.get_cart(user_id)
-        return jsonify(cart.to_dict()), 200
+        return ojsonify(cart.to_dict()), 200
     except Exception as e:
-        logger.error(f"Error retrieving cart: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        logger.error("Error retrieving cart: %s", e)
+        return ojsonify({"error": "Internal server error"}), 500
 
 
 @app.route('/cart/<user_id>/checkout', methods=['POST'])
@@ -106,54 +207,52 @@ def checkout(user_id: str):
         "discount_code": "string" (optional)
     }
     """
+    cart_service = _get_service('cart_service')
+    order_service = _get_service('order_service')
+    discount_service = _get_service('discount_service')
     try:
         # Validate request data
-        validation_error = validate_checkout_request(request.json)
+        data, validation_error = _read_json_body()
+        if not validation_error:
+            validation_error = validate_checkout_request(data)
         if validation_error:
-            return jsonify({"error": validation_error}), 400
+            return ojsonify({"error": validation_error}), 400
         
-        data = request.json or {}
+        data = data or {}
         discount_code = data.get('discount_code')
         
         # Get user's cart
         cart = cart_service.get_cart(user_id)
         
-        if not cart.items:
-            return jsonify({"error": "Cart is empty"}), 400
+        if cart.is_empty():
+            return ojsonify({"error": "Cart is empty"}), 400
         
         # Validate discount code if provided
         if discount_code:
             if not discount_service.is_discount_code_valid(discount_code):
-                return jsonify({"error": "Invalid or expired discount code"}), 400
+                return ojsonify({"error": "Invalid or expired discount code"}), 400
         
         # Process checkout
         order = order_service.create_order(cart, discount_code)
         
-        # Mark discount code as used if it was applied
-        if discount_code:
-            discount_service.use_discount_code(discount_code)
-        
-        # Clear the cart
-        cart_service.clear_cart(user_id)
-        
         # Check if this order qualifies for a discount code
         total_orders = len(store.orders)
         if total_orders % DISCOUNT_ORDER_FREQUENCY == 0:
             new_discount_code = discount_service.generate_discount_code()
-            logger.info(f"New discount code generated: {new_discount_code.code}")
+            logger.info("New discount code generated: %s", new_discount_code.code)
         
-        logger.info(f"Order {order.order_id} created for user {user_id}")
+        logger.info("Order %s created for user %s", order.order_id, user_id)
         
-        return jsonify({
+        return ojsonify({
             "message": "Order placed successfully",
             "order": order.to_dict()
         }), 201
         
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return ojsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error during checkout: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        logger.error("Error during checkout: %s", e)
+        return ojsonify({"error": "Internal server error"}), 500
 
 
 @app.route('/admin/discount-codes', methods=['POST'])
@@ -161,32 +260,33 @@ def generate_discount_code():
     """
     Admin endpoint to manually generate a discount code
     """
+    discount_service = _get_service('discount_service')
     try:
         # Check if we should generate a discount code
         total_orders = len(store.orders)
         if total_orders % DISCOUNT_ORDER_FREQUENCY != 0:
-            return jsonify({
+            return ojsonify({
                 "error": f"Discount code can only be generated every {DISCOUNT_ORDER_FREQUENCY} orders. Current orders: {total_orders}"
             }), 400
         
         # Check if there's already an unused discount code
         if discount_service.has_unused_discount_code():
-            return jsonify({
+            return ojsonify({
                 "error": "There is already an unused discount code available"
             }), 400
         
         discount_code = discount_service.generate_discount_code()
         
-        logger.info(f"Admin generated discount code: {discount_code.code}")
+        logger.info("Admin generated discount code: %s", discount_code.code)
         
-        return jsonify({
+        return ojsonify({
             "message": "Discount code generated successfully",
             "discount_code": discount_code.to_dict()
         }), 201
         
     except Exception as e:
-        logger.error(f"Error generating discount code: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        logger.error("Error generating discount code: %s", e)
+        return ojsonify({"error": "Internal server error"}), 500
 
 
 @app.route('/admin/stats', methods=['GET'])
@@ -194,13 +294,14 @@ def get_admin_stats():
     """
     Admin endpoint to get store statistics
     """
+    admin_service = _get_service('admin_service')
     try:
         stats = admin_service.get_store_statistics()
-        return jsonify(stats), 200
+        return ojsonify(stats), 200
         
     except Exception as e:
-        logger.error(f"Error retrieving admin stats: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        logger.error("Error retrieving admin stats: %s", e)
+        return ojsonify({"error": "Internal server error"}), 500
 
 
 @app.route('/admin/discount-codes', methods=['GET'])
@@ -210,33 +311,39 @@ def list_discount_codes():
     """
     try:
         discount_codes = [dc.to_dict() for dc in store.discount_codes.values()]
-        return jsonify({
+        return ojsonify({
             "discount_codes": discount_codes,
             "total_count": len(discount_codes)
         }), 200
         
     except Exception as e:
-        logger.error(f"Error listing discount codes: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        logger.error("Error listing discount codes: %s", e)
+        return ojsonify({"error": "Internal server error"}), 500
 
 
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
-    return jsonify({"error": "Endpoint not found"}), 404
+    return ojsonify({"error": "Endpoint not found"}), 404
 
 
 @app.errorhandler(405)
 def method_not_allowed(error):
     """Handle 405 errors"""
-    return jsonify({"error": "Method not allowed"}), 405
+    return ojsonify({"error": "Method not allowed"}), 405
+
+
+@app.errorhandler(413)
+def request_entity_too_large(error):
+    """Handle 413 errors"""
+    return ojsonify({"error": "Request body too large"}), 413
 
 
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
-    logger.error(f"Internal server error: {str(error)}")
-    return jsonify({"error": "Internal server error"}), 500
+    logger.error("Internal server error: %s", error)
+    return ojsonify({"error": "Internal server error"}), 500
 
 
 if __name__ == '__main__':
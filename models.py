@@ -3,112 +3,275 @@ Data models for the e-commerce store
 Contains all data structures and in-memory storage implementation
 """
 
+from collections import defaultdict
+from contextvars import ContextVar, Token
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, ClassVar, Dict, Iterable, List, Optional, Tuple
+import threading
+import time
 import uuid
 
+import attrs
 
-@dataclass
+
+# Money is stored as integer cents and converted to float amounts only at the
+# API boundary (constructor prices and to_dict output)
+
+# Largest cent amount a float holds exactly; bounding prices and subtotals by
+# it keeps every cents / 100 conversion (including summed totals) finite
+MAX_CENTS = 2 ** 53
+
+
+def to_cents(amount: float) -> int:
+    """
+    Convert a currency amount to integer cents
+    
+    Raises:
+        ValueError: If the amount is too large to represent
+    """
+    try:
+        cents = round(amount * 100)
+    except OverflowError:
+        raise ValueError("Amount is too large") from None
+    if cents > MAX_CENTS:
+        raise ValueError("Amount is too large")
+    return cents
+
+
+# Timestamps are stored as integer nanoseconds since the epoch (UTC) and only
+# turned into datetime objects when serialized
+NANOSECONDS_PER_DAY = 24 * 60 * 60 * 10**9
+_EPOCH = datetime(1970, 1, 1)
+
+
+# Clock snapshot for the current request, set by the web layer
+_request_time: ContextVar[Optional[int]] = ContextVar('request_time', default=None)
+
+
+def set_request_time(timestamp: int) -> Token:
+    """Pin now_ns() to timestamp for the current context"""
+    return _request_time.set(timestamp)
+
+
+def reset_request_time(token: Token):
+    """Undo a previous set_request_time()"""
+    _request_time.reset(token)
+
+
+def now_ns() -> int:
+    """Current time in nanoseconds, using the request snapshot when one is set"""
+    timestamp = _request_time.get()
+    return time.time_ns() if timestamp is None else timestamp
+
+
+def timestamp_to_datetime(timestamp: Optional[int]) -> Optional[datetime]:
+    """Convert a nanosecond timestamp to a naive UTC datetime"""
+    if timestamp is None:
+        return None
+    return _EPOCH + timedelta(microseconds=timestamp // 1000)
+
+
+@dataclass(slots=True)
 class Item:
     """Represents an item in the store"""
     item_id: str
     name: str
     price: float
     quantity: int
+    price_cents: int = field(default=0, init=False, repr=False)
+    subtotal_cents: int = field(default=0, init=False)
     
     def __post_init__(self):
-        """Validate item data after initialization"""
+        """Validate item data and compute amounts in cents after initialization"""
         if self.price < 0:
             raise ValueError("Price cannot be negative")
         if self.quantity <= 0:
             raise ValueError("Quantity must be positive")
+        self.price_cents = to_cents(self.price)
+        self.subtotal_cents = self.price_cents * self.quantity
+        if self.subtotal_cents > MAX_CENTS:
+            raise ValueError("Subtotal is too large")
+    
+    @property
+    def subtotal(self) -> float:
+        """Subtotal as a currency amount"""
+        return self.subtotal_cents / 100
     
     def to_dict(self) -> dict:
         """Convert item to dictionary"""
         return {
             "item_id": self.item_id,
             "name": self.name,
-            "price": self.price,
+            "price": self.price_cents / 100,
+            "quantity": self.quantity,
+            "subtotal": self.subtotal_cents / 100
+        }
+
+
+@attrs.define(slots=True, frozen=True, weakref_slot=False)
+class OrderItem:
+    """Immutable snapshot of a cart item taken at checkout"""
+    item_id: str
+    name: str
+    price_cents: int
+    quantity: int
+    subtotal_cents: int
+    
+    @classmethod
+    def from_item(cls, item: Item) -> 'OrderItem':
+        """Snapshot a cart item"""
+        return cls(item.item_id, item.name, item.price_cents, item.quantity, item.subtotal_cents)
+    
+    @property
+    def price(self) -> float:
+        """Unit price as a currency amount"""
+        return self.price_cents / 100
+    
+    @property
+    def subtotal(self) -> float:
+        """Subtotal as a currency amount"""
+        return self.subtotal_cents / 100
+    
+    def to_dict(self) -> dict:
+        """Convert order item to dictionary"""
+        return {
+            "item_id": self.item_id,
+            "name": self.name,
+            "price": self.price_cents / 100,
             "quantity": self.quantity,
-            "subtotal": self.price * self.quantity
+            "subtotal": self.subtotal_cents / 100
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Cart:
     """Represents a user's shopping cart"""
     user_id: str
-    items: List[Item] = field(default_factory=list)
-    created_at: datetime = field(default_factory=datetime.utcnow)
-    updated_at: datetime = field(default_factory=datetime.utcnow)
+    created_at: int = field(default_factory=now_ns)
+    updated_at: int = field(default_factory=now_ns)
+    # Items keyed by item_id (in insertion order) plus running totals,
+    # maintained on every mutation
+    _items: Dict[str, Item] = field(default_factory=dict, init=False, repr=False)
+    _total_cents: int = field(default=0, init=False, repr=False)
+    _count: int = field(default=0, init=False, repr=False)
+    
+    @property
+    def items(self) -> List[Item]:
+        """Items in the cart, in the order they were first added"""
+        return list(self._items.values())
     
     def add_item(self, item: Item):
         """Add item to cart or update quantity if item already exists"""
-        existing_item = self.find_item(item.item_id)
+        existing_item = self._items.get(item.item_id)
         if existing_item:
+            subtotal_cents = existing_item.price_cents * (existing_item.quantity + item.quantity)
+            if subtotal_cents > MAX_CENTS:
+                raise ValueError("Subtotal is too large")
             existing_item.quantity += item.quantity
+            existing_item.subtotal_cents = subtotal_cents
+            self._total_cents += existing_item.price_cents * item.quantity
         else:
-            self.items.append(item)
-        self.updated_at = datetime.utcnow()
+            self._items[item.item_id] = item
+            self._total_cents += item.subtotal_cents
+        self._count += item.quantity
+        self.updated_at = now_ns()
+    
+    def remove_item(self, item_id: str) -> Item:
+        """
+        Remove item from cart by item_id
+        
+        Raises:
+            KeyError: If the item is not in the cart
+        """
+        item = self._items.pop(item_id)
+        self._total_cents -= item.subtotal_cents
+        self._count -= item.quantity
+        self.updated_at = now_ns()
+        return item
     
     def find_item(self, item_id: str) -> Optional[Item]:
         """Find item in cart by item_id"""
-        return next((item for item in self.items if item.item_id == item_id), None)
+        return self._items.get(item_id)
+    
+    def is_empty(self) -> bool:
+        """Check if cart has no items"""
+        return not self._items
     
     def get_total(self) -> float:
-        """Calculate total cart value"""
-        return sum(item.price * item.quantity for item in self.items)
+        """Get total cart value"""
+        return self._total_cents / 100
+    
+    def get_total_cents(self) -> int:
+        """Get total cart value in cents"""
+        return self._total_cents
     
     def get_item_count(self) -> int:
         """Get total number of items in cart"""
-        return sum(item.quantity for item in self.items)
+        return self._count
+    
+    def consume_items(self) -> Iterable[Item]:
+        """Take all items out of the cart, leaving it empty"""
+        # Hand the old dict over instead of copying its items
+        items = self._items
+        self._items = {}
+        self._total_cents = 0
+        self._count = 0
+        self.updated_at = now_ns()
+        return items.values()
     
     def clear(self):
         """Clear all items from cart"""
-        self.items.clear()
-        self.updated_at = datetime.utcnow()
+        self._items.clear()
+        self._total_cents = 0
+        self._count = 0
+        self.updated_at = now_ns()
     
     def to_dict(self) -> dict:
         """Convert cart to dictionary"""
+        # Snapshot the items in one C-level call; iterating the live dict would
+        # fail if another thread added an item mid-serialization
+        items = list(self._items.values())
         return {
             "user_id": self.user_id,
-            "items": [item.to_dict() for item in self.items],
-            "total_items": self.get_item_count(),
-            "total_amount": self.get_total(),
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat()
+            "items": [item.to_dict() for item in items],
+            "total_items": self._count,
+            "total_amount": self._total_cents / 100,
+            "created_at": timestamp_to_datetime(self.created_at),
+            "updated_at": timestamp_to_datetime(self.updated_at)
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class DiscountCode:
     """Represents a discount code"""
     code: str
     discount_percentage: float
     is_used: bool = False
-    created_at: datetime = field(default_factory=datetime.utcnow)
-    used_at: Optional[datetime] = None
-    expires_at: Optional[datetime] = None
+    created_at: int = field(default_factory=now_ns)
+    used_at: Optional[int] = None
+    expires_at: Optional[int] = None
+    fraction: float = field(default=0.0, init=False, repr=False)
     
     def __post_init__(self):
-        """Set default expiration if not provided"""
+        """Precompute discount fraction and set default expiration if not provided"""
+        self.fraction = self.discount_percentage / 100.0
         if self.expires_at is None:
             # Discount codes expire after 30 days by default
-            self.expires_at = self.created_at + timedelta(days=30)
+            self.expires_at = self.created_at + 30 * NANOSECONDS_PER_DAY
     
     def is_valid(self) -> bool:
         """Check if discount code is valid and not expired"""
         if self.is_used:
             return False
-        if self.expires_at and datetime.utcnow() > self.expires_at:
+        if self.expires_at and now_ns() > self.expires_at:
             return False
         return True
     
     def use(self):
         """Mark discount code as used"""
         self.is_used = True
-        self.used_at = datetime.utcnow()
+        self.used_at = now_ns()
     
     def to_dict(self) -> dict:
         """Convert discount code to dictionary"""
@@ -116,32 +279,61 @@ class DiscountCode:
             "code": self.code,
             "discount_percentage": self.discount_percentage,
             "is_used": self.is_used,
-            "created_at": self.created_at.isoformat(),
-            "used_at": self.used_at.isoformat() if self.used_at else None,
-            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "created_at": timestamp_to_datetime(self.created_at),
+            "used_at": timestamp_to_datetime(self.used_at),
+            "expires_at": timestamp_to_datetime(self.expires_at),
             "is_valid": self.is_valid()
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """Represents a completed order"""
     order_id: str
     user_id: str
-    items: List[Item]
-    subtotal: float
+    items: Tuple[OrderItem, ...]
+    subtotal_cents: int
     discount_code: Optional[str] = None
-    discount_amount: float = 0.0
-    total_amount: float = 0.0
-    created_at: datetime = field(default_factory=datetime.utcnow)
+    discount_amount_cents: int = 0
+    total_amount_cents: int = 0
+    created_at: int = field(default_factory=now_ns)
+    item_count: int = 0
+    created_at_iso: str = field(default='', init=False, repr=False, compare=False)
+    # Orders are not modified after creation, so to_dict() output is cached
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        """Calculate total amount after initialization"""
-        if self.total_amount == 0.0:
-            self.total_amount = self.subtotal - self.discount_amount
+        """Freeze items and calculate totals after initialization"""
+        self.items = tuple(self.items)
+        self.created_at_iso = timestamp_to_datetime(self.created_at).isoformat()
+        if self.total_amount_cents == 0:
+            self.total_amount_cents = self.subtotal_cents - self.discount_amount_cents
+        if self.item_count == 0:
+            self.item_count = sum(item.quantity for item in self.items)
+    
+    @property
+    def subtotal(self) -> float:
+        """Subtotal as a currency amount"""
+        return self.subtotal_cents / 100
+    
+    @property
+    def discount_amount(self) -> float:
+        """Discount as a currency amount"""
+        return self.discount_amount_cents / 100
+    
+    @property
+    def total_amount(self) -> float:
+        """Total as a currency amount"""
+        return self.total_amount_cents / 100
     
     def to_dict(self) -> dict:
         """Convert order to dictionary"""
+        if self._cached_dict is None:
+            self._cached_dict = self._build_dict()
+        return self._cached_dict
+    
+    def _build_dict(self) -> dict:
+        """Build the dictionary representation of the order"""
         return {
             "order_id": self.order_id,
             "user_id": self.user_id,
@@ -150,7 +342,7 @@ class Order:
             "discount_code": self.discount_code,
             "discount_amount": self.discount_amount,
             "total_amount": self.total_amount,
-            "created_at": self.created_at.isoformat()
+            "created_at": self.created_at_iso
         }
 
 
@@ -160,54 +352,129 @@ class InMemoryStore:
     
     This class manages all data persistence using Python dictionaries.
     In a production environment, this would be replaced with a proper database.
+    The application shares a single store obtained through instance(); creating
+    InMemoryStore() directly gives an independent store (useful for testing).
     """
     
+    _instance: ClassVar[Optional['InMemoryStore']] = None
+    _instance_lock: ClassVar[threading.Lock] = threading.Lock()
+    
+    @classmethod
+    def instance(cls) -> 'InMemoryStore':
+        """Get the shared store, creating it on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+    
     def __init__(self):
         """Initialize empty data stores"""
+        # Guards writes so concurrent requests see consistent data
+        self._lock = threading.RLock()
+        
         # Store user carts - key: user_id, value: Cart
         self.carts: Dict[str, Cart] = {}
         
         # Store completed orders - key: order_id, value: Order
         self.orders: Dict[str, Order] = {}
         
+        # Index of orders per user - key: user_id, value: list of Order
+        self._orders_by_user: Dict[str, List[Order]] = defaultdict(list)
+        
         # Store discount codes - key: code, value: DiscountCode
         self.discount_codes: Dict[str, DiscountCode] = {}
         
+        # Codes saved while unused, in creation order (a dict used as an
+        # ordered set); used/expired ones are swept out lazily
+        self._unused_codes: Dict[str, None] = {}
+        
         # Track order count for discount code generation
         self.order_counter = 0
+        
+        # Running order aggregates (amounts in cents), updated in save_order
+        self._total_items = 0
+        self._total_purchase_cents = 0
+        self._total_discount_cents = 0
+        
+        # Memoized admin statistics, rebuilt after order/discount code changes
+        # or once the next unused code expires
+        self._stats_cache: Optional[Dict] = None
+        self._stats_dirty = True
+        self._stats_expires_at: Optional[int] = None
+    
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        Store lock, re-entrant
+        
+        Carts are mutated in place, so services hold this lock around cart
+        changes that must be seen as a whole by concurrent requests.
+        """
+        return self._lock
     
     def get_cart(self, user_id: str) -> Cart:
         """Get or create cart for user"""
-        if user_id not in self.carts:
-            self.carts[user_id] = Cart(user_id=user_id)
-        return self.carts[user_id]
+        cart = self.carts.get(user_id)
+        if cart is None:
+            with self._lock:
+                cart = self.carts.setdefault(user_id, Cart(user_id=user_id))
+        return cart
     
     def save_cart(self, cart: Cart):
         """Save cart to store"""
-        self.carts[cart.user_id] = cart
+        with self._lock:
+            self.carts[cart.user_id] = cart
     
     def delete_cart(self, user_id: str):
         """Delete cart from store"""
-        if user_id in self.carts:
-            del self.carts[user_id]
+        with self._lock:
+            self.carts.pop(user_id, None)
     
     def save_order(self, order: Order):
         """Save order to store"""
-        self.orders[order.order_id] = order
-        self.order_counter += 1
+        with self._lock:
+            if order.order_id not in self.orders:
+                self._orders_by_user[order.user_id].append(order)
+                self._total_items += order.item_count
+                self._total_purchase_cents += order.total_amount_cents
+                self._total_discount_cents += order.discount_amount_cents
+            self.orders[order.order_id] = order
+            self.order_counter += 1
+            self._stats_dirty = True
     
     def get_order(self, order_id: str) -> Optional[Order]:
         """Get order by ID"""
         return self.orders.get(order_id)
     
+    def get_orders_by_user(self, user_id: str) -> List[Order]:
+        """Get all orders placed by a user"""
+        return list(self._orders_by_user.get(user_id, ()))
+    
     def save_discount_code(self, discount_code: DiscountCode):
         """Save discount code to store"""
-        self.discount_codes[discount_code.code] = discount_code
+        with self._lock:
+            self.discount_codes[discount_code.code] = discount_code
+            if discount_code.is_used:
+                self._unused_codes.pop(discount_code.code, None)
+            else:
+                self._unused_codes.setdefault(discount_code.code, None)
+            self._stats_dirty = True
+    
+    def discount_code_used(self, discount_code: DiscountCode):
+        """Update derived state after a stored discount code was used in place"""
+        with self._lock:
+            self._unused_codes.pop(discount_code.code, None)
+            self._stats_dirty = True
     
     def get_discount_code(self, code: str) -> Optional[DiscountCode]:
         """Get discount code by code"""
         return self.discount_codes.get(code)
     
+    def get_order_count(self) -> int:
+        """Get number of orders placed"""
+        return len(self.orders)
+    
     def get_all_orders(self) -> List[Order]:
         """Get all orders"""
         return list(self.orders.values())
@@ -218,26 +485,76 @@ class InMemoryStore:
     
     def get_unused_discount_codes(self) -> List[DiscountCode]:
         """Get all unused and valid discount codes"""
-        return [dc for dc in self.discount_codes.values() if dc.is_valid()]
+        with self._lock:
+            self._sweep_unused_codes()
+            return [self.discount_codes[code] for code in self._unused_codes]
+    
+    def count_unused_discount_codes(self) -> int:
+        """Count unused and valid discount codes"""
+        with self._lock:
+            self._sweep_unused_codes()
+            return len(self._unused_codes)
+    
+    def has_unused_discount_code(self) -> bool:
+        """Check if at least one unused and valid discount code exists"""
+        with self._lock:
+            return any(self._is_unused_code(code) for code in self._unused_codes)
+    
+    def _is_unused_code(self, code: str) -> bool:
+        """Check if a tracked code still exists and is valid"""
+        discount_code = self.discount_codes.get(code)
+        return discount_code is not None and discount_code.is_valid()
+    
+    def _sweep_unused_codes(self):
+        """Drop codes that were used, expired or removed since they were saved"""
+        stale = [code for code in self._unused_codes if not self._is_unused_code(code)]
+        for code in stale:
+            del self._unused_codes[code]
     
     def get_total_items_purchased(self) -> int:
-        """Calculate total number of items purchased across all orders"""
-        return sum(
-            sum(item.quantity for item in order.items)
-            for order in self.orders.values()
-        )
+        """Get total number of items purchased across all orders"""
+        return self._total_items
     
-    def get_total_purchase_amount(self) -> float:
-        """Calculate total purchase amount across all orders"""
-        return sum(order.total_amount for order in self.orders.values())
+    def get_total_purchase_cents(self) -> int:
+        """Get total purchase amount in cents across all orders"""
+        return self._total_purchase_cents
     
-    def get_total_discount_amount(self) -> float:
-        """Calculate total discount amount given across all orders"""
-        return sum(order.discount_amount for order in self.orders.values())
+    def get_total_discount_cents(self) -> int:
+        """Get total discount amount in cents given across all orders"""
+        return self._total_discount_cents
+    
+    def get_memoized_statistics(self, build: Callable[[], Dict]) -> Dict:
+        """
+        Get statistics built by build(), reusing the last result while valid
+        
+        The cached result is shared between callers and must not be modified.
+        """
+        with self._lock:
+            stats = self._stats_cache
+            expired = self._stats_expires_at is not None and now_ns() >= self._stats_expires_at
+            if stats is None or self._stats_dirty or expired:
+                stats = self._stats_cache = build()
+                self._stats_dirty = False
+                self._sweep_unused_codes()
+                expiries = (self.discount_codes[code].expires_at for code in self._unused_codes)
+                self._stats_expires_at = min(
+                    (expires_at for expires_at in expiries if expires_at is not None),
+                    default=None
+                )
+            return stats
     
     def reset(self):
         """Reset all data (useful for testing)"""
-        self.carts.clear()
-        self.orders.clear()
-        self.discount_codes.clear()
-        self.order_counter = 0
\ No newline at end of file
+        with self._lock:
+            self.carts.clear()
+            self.orders.clear()
+            self._orders_by_user.clear()
+            self.discount_codes.clear()
+            self._unused_codes.clear()
+            self.order_counter = 0
+            self._total_items = 0
+            self._total_purchase_cents = 0
+            self._total_discount_cents = 0
+            self._stats_cache = None
+            self._stats_dirty = True
+            self._stats_expires_at = None
\ No newline at end of file
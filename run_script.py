@@ -11,23 +11,26 @@ from app import app
 from config import get_config
 
 
-def run_server(host='0.0.0.0', port=5000, debug=True, env='development'):
+def run_server(host='0.0.0.0', port=5000, debug=True, env='development',
+               workers=1, worker_class='gevent'):
     """
-    Run the Flask development server
+    Run the API server
+    
+    Production runs replace this process with gunicorn; other environments
+    use the Flask development server.
     
     Args:
         host: Host to bind to
         port: Port to bind to  
         debug: Enable debug mode
         env: Environment (development, production, testing)
+        workers: Number of gunicorn worker processes (production only)
+        worker_class: Gunicorn worker class (production only)
     """
-    # Set environment
+    # Set environment; gunicorn workers inherit it and the app module loads the
+    # matching config on import
     os.environ['FLASK_ENV'] = env
     
-    # Configure app
-    config_class = get_config()
-    app.config.from_object(config_class)
-    
     print(f"Starting e-commerce API server...")
     print(f"Environment: {env}")
     print(f"Debug mode: {debug}")
@@ -36,6 +39,20 @@ def run_server(host='0.0.0.0', port=5000, debug=True, env='development'):
     print(f"API Documentation: See README.md")
     print("-" * 50)
     
+    if env == 'production':
+        # Each worker process holds its own in-memory store, so keep the
+        # default of a single worker and scale with gevent concurrency
+        os.execvp('gunicorn', [
+            'gunicorn',
+            '-k', worker_class,
+            '-w', str(workers),
+            '-b', f'{host}:{port}',
+            'app:app'
+        ])
+    
+    # Configure app for the in-process development server
+    app.config.from_object(get_config())
+    
     # Run the server
     app.run(host=host, port=port, debug=debug)
 
@@ -58,6 +75,15 @@ def main():
                        default='development',
                        help='Environment to run in (default: development)')
     
+    parser.add_argument('--workers',
+                       type=int,
+                       default=1,
+                       help='Number of gunicorn workers in production (default: 1)')
+    
+    parser.add_argument('--worker-class',
+                       default='gevent',
+                       help='Gunicorn worker class in production (default: gevent)')
+    
     parser.add_argument('--no-debug',
                        action='store_true',
                        help='Disable debug mode')
@@ -77,9 +103,10 @@ def main():
         print("Running in testing mode...")
         
         # Load some test data
-        from models import Item
+        from models import InMemoryStore, Item
         from services import CartService, OrderService, DiscountService
-        from app import store
+        
+        store = InMemoryStore.instance()
         
         cart_service = CartService(store)
         order_service = OrderService(store)
@@ -103,9 +130,8 @@ def main():
         for i in range(2):
             user_id = f"testuser{i+1}"
             cart = cart_service.get_cart(user_id)
-            if cart.items:
+            if not cart.is_empty():
                 order_service.create_order(cart)
-                cart_service.clear_cart(user_id)
         
         print("Test data loaded successfully!")
         print("Try these test users: testuser1, testuser2")
@@ -115,7 +141,9 @@ def main():
             host=args.host,
             port=args.port,
             debug=debug,
-            env=args.env
+            env=args.env,
+            workers=args.workers,
+            worker_class=args.worker_class
         )
     except KeyboardInterrupt:
         print("\nShutting down server...")
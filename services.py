@@ -4,14 +4,19 @@ Handles cart operations, order processing, discount management, and admin functi
 """
 
 import uuid
-from datetime import datetime
-from typing import Optional, Dict, List
+import secrets
+from collections import deque
+from typing import Deque, Optional, Dict, List, Tuple
 import logging
 
-from models import InMemoryStore, Cart, Order, Item, DiscountCode
+from models import InMemoryStore, Cart, Order, OrderItem, Item, DiscountCode
 
 logger = logging.getLogger(__name__)
 
+# Number of discount code suffixes generated per refill of the code pool
+CODE_POOL_SIZE = 32
+_CODE_PREFIX = "DISCOUNT"
+
 
 class CartService:
     """Service for managing shopping cart operations"""
@@ -36,11 +41,12 @@ class CartService:
         if not user_id.strip():
             raise ValueError("User ID cannot be empty")
         
-        cart = self.store.get_cart(user_id)
-        cart.add_item(item)
-        self.store.save_cart(cart)
+        with self.store.lock:
+            cart = self.store.get_cart(user_id)
+            cart.add_item(item)
+            self.store.save_cart(cart)
         
-        logger.info(f"Added item {item.item_id} (qty: {item.quantity}) to cart for user {user_id}")
+        logger.info("Added item %s (qty: %d) to cart for user %s", item.item_id, item.quantity, user_id)
         return cart
     
     def get_cart(self, user_id: str) -> Cart:
@@ -62,10 +68,11 @@ class CartService:
         Args:
             user_id: User identifier
         """
-        cart = self.store.get_cart(user_id)
-        cart.clear()
-        self.store.save_cart(cart)
-        logger.info(f"Cleared cart for user {user_id}")
+        with self.store.lock:
+            cart = self.store.get_cart(user_id)
+            cart.clear()
+            self.store.save_cart(cart)
+        logger.info("Cleared cart for user %s", user_id)
     
     def remove_item_from_cart(self, user_id: str, item_id: str) -> Cart:
         """
@@ -81,17 +88,17 @@ class CartService:
         Raises:
             ValueError: If item is not found in cart
         """
-        cart = self.store.get_cart(user_id)
-        item = cart.find_item(item_id)
-        
-        if not item:
-            raise ValueError(f"Item {item_id} not found in cart")
-        
-        cart.items.remove(item)
-        cart.updated_at = datetime.utcnow()
-        self.store.save_cart(cart)
+        with self.store.lock:
+            cart = self.store.get_cart(user_id)
+            
+            try:
+                cart.remove_item(item_id)
+            except KeyError:
+                raise ValueError(f"Item {item_id} not found in cart")
+            
+            self.store.save_cart(cart)
         
-        logger.info(f"Removed item {item_id} from cart for user {user_id}")
+        logger.info("Removed item %s from cart for user %s", item_id, user_id)
         return cart
 
 
@@ -105,6 +112,9 @@ class OrderService:
         """
         Create an order from a cart
         
+        The cart's items are moved into the order, leaving the cart empty, and
+        the discount code, if any, is marked as used.
+        
         Args:
             cart: Cart to convert to order
             discount_code: Optional discount code to apply
@@ -115,34 +125,42 @@ class OrderService:
         Raises:
             ValueError: If cart is empty or discount code is invalid
         """
-        if not cart.items:
-            raise ValueError("Cannot create order from empty cart")
-        
-        # Calculate subtotal
-        subtotal = cart.get_total()
-        discount_amount = 0.0
-        
-        # Apply discount if code is provided
-        if discount_code:
-            discount = self.store.get_discount_code(discount_code)
-            if not discount or not discount.is_valid():
-                raise ValueError("Invalid or expired discount code")
+        # Validate and redeem the discount code, read totals and consume the
+        # items in one step, so concurrent checkouts cannot share a code or
+        # pick up a cart update half-way
+        discount = None
+        with self.store.lock:
+            if cart.is_empty():
+                raise ValueError("Cannot create order from empty cart")
+            
+            if discount_code:
+                discount = self.store.get_discount_code(discount_code)
+                if not discount or not discount.is_valid():
+                    raise ValueError("Invalid or expired discount code")
             
-            discount_amount = subtotal * (discount.discount_percentage / 100)
+            subtotal_cents = cart.get_total_cents()
+            item_count = cart.get_item_count()
+            items = tuple(OrderItem.from_item(item) for item in cart.consume_items())
+            
+            if discount:
+                discount.use()
+                self.store.discount_code_used(discount)
+        discount_amount_cents = round(subtotal_cents * discount.fraction) if discount else 0
         
         # Create order
         order = Order(
             order_id=str(uuid.uuid4()),
             user_id=cart.user_id,
-            items=cart.items.copy(),  # Copy items to preserve order data
-            subtotal=subtotal,
+            items=items,
+            subtotal_cents=subtotal_cents,
             discount_code=discount_code,
-            discount_amount=discount_amount,
-            total_amount=subtotal - discount_amount
+            discount_amount_cents=discount_amount_cents,
+            total_amount_cents=subtotal_cents - discount_amount_cents,
+            item_count=item_count
         )
         
         self.store.save_order(order)
-        logger.info(f"Created order {order.order_id} for user {cart.user_id} with total {order.total_amount}")
+        logger.info("Created order %s for user %s with total %s", order.order_id, cart.user_id, order.total_amount)
         
         return order
     
@@ -168,7 +186,7 @@ class OrderService:
         Returns:
             List of user's orders
         """
-        return [order for order in self.store.get_all_orders() if order.user_id == user_id]
+        return self.store.get_orders_by_user(user_id)
 
 
 class DiscountService:
@@ -177,6 +195,17 @@ class DiscountService:
     def __init__(self, store: InMemoryStore):
         self.store = store
         self.discount_percentage = 10.0  # 10% discount
+        # Pre-generated random code suffixes, refilled in batches
+        self._code_pool: Deque[str] = deque()
+    
+    def _next_code_suffix(self) -> str:
+        """Take a code suffix from the pool, refilling it with one RNG call when empty"""
+        try:
+            return self._code_pool.popleft()
+        except IndexError:
+            suffixes = secrets.token_hex(4 * CODE_POOL_SIZE).upper()
+            self._code_pool.extend(suffixes[i:i + 8] for i in range(8, len(suffixes), 8))
+            return suffixes[:8]
     
     def generate_discount_code(self) -> DiscountCode:
         """
@@ -185,7 +214,7 @@ class DiscountService:
         Returns:
             Generated discount code object
         """
-        code = f"DISCOUNT{uuid.uuid4().hex[:8].upper()}"
+        code = _CODE_PREFIX + self._next_code_suffix()
         
         discount_code = DiscountCode(
             code=code,
@@ -193,7 +222,7 @@ class DiscountService:
         )
         
         self.store.save_discount_code(discount_code)
-        logger.info(f"Generated new discount code: {code}")
+        logger.info("Generated new discount code: %s", code)
         
         return discount_code
     
@@ -228,9 +257,11 @@ class DiscountService:
         if not discount.is_valid():
             raise ValueError("Discount code is expired or already used")
         
+        # The store hands out live references, so the code is updated in place
+        # and only the store's derived state needs refreshing
         discount.use()
-        self.store.save_discount_code(discount)
-        logger.info(f"Marked discount code {code} as used")
+        self.store.discount_code_used(discount)
+        logger.info("Marked discount code %s as used", code)
     
     def has_unused_discount_code(self) -> bool:
         """
@@ -239,7 +270,7 @@ class DiscountService:
         Returns:
             True if there's at least one unused discount code, False otherwise
         """
-        return len(self.store.get_unused_discount_codes()) > 0
+        return self.store.has_unused_discount_code()
     
     def get_available_discount_codes(self) -> List[DiscountCode]:
         """
@@ -261,44 +292,52 @@ class AdminService:
         """
         Get comprehensive store statistics
         
+        Statistics are memoized by the store until an order or discount code
+        is saved, or an unused code expires.
+        
         Returns:
             Dictionary containing store statistics
         """
-        orders = self.store.get_all_orders()
-        discount_codes = self.store.get_all_discount_codes()
-        
-        # Calculate statistics
-        total_orders = len(orders)
+        return self.store.get_memoized_statistics(self._build_store_statistics)
+    
+    def _build_store_statistics(self) -> Dict:
+        """Compute store statistics from the current store contents"""
+        # Order statistics come from the store's running aggregates
+        total_orders = self.store.get_order_count()
         total_items_purchased = self.store.get_total_items_purchased()
-        total_purchase_amount = self.store.get_total_purchase_amount()
-        total_discount_amount = self.store.get_total_discount_amount()
+        total_purchase_cents = self.store.get_total_purchase_cents()
+        total_discount_cents = self.store.get_total_discount_cents()
         
         # Discount code statistics
-        total_discount_codes = len(discount_codes)
-        used_discount_codes = len([dc for dc in discount_codes if dc.is_used])
-        available_discount_codes = len(self.store.get_unused_discount_codes())
+        serialized_codes, used_discount_codes = self._serialize_discount_codes()
+        total_discount_codes = len(serialized_codes)
+        available_discount_codes = self.store.count_unused_discount_codes()
+        
+        # Revenue statistics, rounded to whole cents
+        average_order_cents = round(total_purchase_cents / total_orders) if total_orders > 0 else 0
         
-        # Revenue statistics
-        average_order_value = total_purchase_amount / total_orders if total_orders > 0 else 0
+        # Convert cents to currency amounts once and reuse them below
+        total_purchase_amount = total_purchase_cents / 100
+        total_discount_amount = total_discount_cents / 100
         
         stats = {
             "orders": {
                 "total_orders": total_orders,
                 "total_items_purchased": total_items_purchased,
-                "total_purchase_amount": round(total_purchase_amount, 2),
-                "average_order_value": round(average_order_value, 2)
+                "total_purchase_amount": total_purchase_amount,
+                "average_order_value": average_order_cents / 100
             },
             "discounts": {
                 "total_discount_codes": total_discount_codes,
                 "used_discount_codes": used_discount_codes,
                 "available_discount_codes": available_discount_codes,
-                "total_discount_amount": round(total_discount_amount, 2),
-                "discount_codes": [dc.to_dict() for dc in discount_codes]
+                "total_discount_amount": total_discount_amount,
+                "discount_codes": serialized_codes
             },
             "revenue": {
-                "gross_revenue": round(total_purchase_amount + total_discount_amount, 2),
-                "net_revenue": round(total_purchase_amount, 2),
-                "total_savings_given": round(total_discount_amount, 2)
+                "gross_revenue": (total_purchase_cents + total_discount_cents) / 100,
+                "net_revenue": total_purchase_amount,
+                "total_savings_given": total_discount_amount
             }
         }
         
@@ -320,7 +359,7 @@ class AdminService:
                 "total_amount": order.total_amount,
                 "discount_applied": order.discount_code is not None,
                 "discount_amount": order.discount_amount,
-                "created_at": order.created_at.isoformat()
+                "created_at": order.created_at_iso
             }
             for order in orders
         ]
@@ -332,11 +371,25 @@ class AdminService:
         Returns:
             Dictionary containing discount code statistics
         """
-        discount_codes = self.store.get_all_discount_codes()
+        serialized_codes, used_codes = self._serialize_discount_codes()
         
         return {
-            "total_codes": len(discount_codes),
-            "used_codes": len([dc for dc in discount_codes if dc.is_used]),
-            "available_codes": len(self.store.get_unused_discount_codes()),
-            "codes": [dc.to_dict() for dc in discount_codes]
-        }
\ No newline at end of file
+            "total_codes": len(serialized_codes),
+            "used_codes": used_codes,
+            "available_codes": self.store.count_unused_discount_codes(),
+            "codes": serialized_codes
+        }
+    
+    def _serialize_discount_codes(self) -> Tuple[List[Dict], int]:
+        """
+        Serialize all discount codes and count used ones in a single pass
+        
+        Returns:
+            Tuple of (serialized discount codes, number of used codes)
+        """
+        serialized = []
+        used = 0
+        for dc in self.store.get_all_discount_codes():
+            serialized.append(dc.to_dict())
+            used += dc.is_used
+        return serialized, used
\ No newline at end of file
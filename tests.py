@@ -5,11 +5,13 @@ Tests all endpoints and business logic functionality
 
 import unittest
 import json
-from datetime import datetime, timedelta
+import time
 
 from app import app
-from models import InMemoryStore, Item, Cart, Order, DiscountCode
+from models import (InMemoryStore, Item, Cart, Order, OrderItem, DiscountCode, NANOSECONDS_PER_DAY,
+                    set_request_time, reset_request_time)
 from services import CartService, OrderService, DiscountService, AdminService
+from validators import validate_add_item_request, validate_pagination_params, validate_pagination_ints
 
 
 class EcommerceAPITestCase(unittest.TestCase):
@@ -93,6 +95,76 @@ class EcommerceAPITestCase(unittest.TestCase):
         
         self.assertEqual(response.status_code, 400)
     
+    def test_add_item_boolean_quantity(self):
+        """Test adding item with a boolean quantity"""
+        item_data = {
+            'item_id': 'item1',
+            'name': 'Test Product',
+            'price': 29.99,
+            'quantity': True
+        }
+        
+        response = self.app.post('/cart/user1/items',
+                                json=item_data,
+                                content_type='application/json')
+        
+        self.assertEqual(response.status_code, 400)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'quantity must be a positive integer')
+    
+    def test_add_item_non_object_body(self):
+        """Test adding item with a JSON body that is not an object"""
+        response = self.app.post('/cart/user1/items',
+                                json=['item_id', 'name', 'price', 'quantity'],
+                                content_type='application/json')
+        
+        self.assertEqual(response.status_code, 400)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Request body must be a JSON object')
+    
+    def test_add_item_amount_too_large(self):
+        """Test an item whose subtotal cannot be represented is rejected"""
+        item_data = {
+            'item_id': 'item1',
+            'name': 'Test Product',
+            'price': 1e300,
+            'quantity': 10**18
+        }
+        
+        response = self.app.post('/cart/user1/items',
+                                json=item_data,
+                                content_type='application/json')
+        
+        self.assertEqual(response.status_code, 400)
+        
+        # Merging quantities past the limit is rejected without changing the cart
+        item_data = {'item_id': 'item2', 'name': 'Test Product', 'price': 1e13, 'quantity': 5}
+        response = self.app.post('/cart/user1/items', json=item_data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.app.post('/cart/user1/items', json=item_data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.app.get('/cart/user1')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['total_items'], 5)
+        
+        response = self.app.get('/admin/stats')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_add_item_malformed_json(self):
+        """Test adding item with a body that is not valid JSON"""
+        response = self.app.post('/cart/user1/items',
+                                data='{"item_id": ',
+                                content_type='application/json')
+        
+        self.assertEqual(response.status_code, 400)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Request body must be valid JSON')
+    
     def test_get_empty_cart(self):
         """Test getting empty cart"""
         response = self.app.get('/cart/user1')
@@ -142,6 +214,24 @@ class EcommerceAPITestCase(unittest.TestCase):
         self.assertEqual(data['order']['user_id'], 'user1')
         self.assertEqual(data['order']['total_amount'], 59.98)
     
+    def test_checkout_malformed_json(self):
+        """Test checkout with a truncated JSON body does not place an order"""
+        self.app.post('/cart/user1/items',
+                     json={'item_id': 'item1', 'name': 'Test Product', 'price': 100.0, 'quantity': 1},
+                     content_type='application/json')
+        
+        response = self.app.post('/cart/user1/checkout',
+                                data='{"discount_code": "DISCOUNTABC',
+                                content_type='application/json')
+        
+        self.assertEqual(response.status_code, 400)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Request body must be valid JSON')
+        
+        cart = json.loads(self.app.get('/cart/user1').data)
+        self.assertEqual(len(cart['items']), 1)
+    
     def test_checkout_with_invalid_discount_code(self):
         """Test checkout with invalid discount code"""
         # Add items to cart
@@ -328,6 +418,22 @@ class EcommerceAPITestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data['error'], 'Endpoint not found')
     
+    def test_request_body_too_large(self):
+        """Test oversized request bodies are rejected with 413"""
+        item_data = {
+            'item_id': 'x' * (app.config['MAX_CONTENT_LENGTH'] + 1),
+            'name': 'Test Product',
+            'price': 29.99,
+            'quantity': 1
+        }
+        
+        response = self.app.post('/cart/user1/items', json=item_data)
+        
+        self.assertEqual(response.status_code, 413)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['error'], 'Request body too large')
+    
     def test_method_not_allowed(self):
         """Test 405 error handling"""
         response = self.app.put('/cart/user1')
@@ -354,6 +460,17 @@ class ModelsTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             Item(item_id='1', name='Test', price=-10.0, quantity=2)
     
+    def test_item_price_rounded_to_cents(self):
+        """Test item price and subtotal are reported from the same cent amount"""
+        item = Item(item_id='1', name='Test', price=19.999, quantity=3)
+        self.assertEqual(item.to_dict()['price'], 20.0)
+        self.assertEqual(item.to_dict()['subtotal'], 60.0)
+    
+    def test_item_price_too_large(self):
+        """Test item with a price that cannot be held in cents raises error"""
+        with self.assertRaises(ValueError):
+            Item(item_id='1', name='Test', price=1e307, quantity=1)
+    
     def test_item_zero_quantity(self):
         """Test item with zero quantity raises error"""
         with self.assertRaises(ValueError):
@@ -383,6 +500,27 @@ class ModelsTestCase(unittest.TestCase):
         self.assertEqual(cart.items[0].quantity, 5)
         self.assertEqual(cart.get_total(), 50.0)
     
+    def test_cart_total_in_cents(self):
+        """Test cart totals are exact to the cent"""
+        cart = Cart(user_id='user1')
+        cart.add_item(Item(item_id='1', name='A', price=0.1, quantity=1))
+        cart.add_item(Item(item_id='2', name='B', price=0.2, quantity=1))
+        
+        self.assertEqual(cart.get_total_cents(), 30)
+        self.assertEqual(cart.get_total(), 0.3)
+    
+    def test_cart_remove_all_items_resets_total(self):
+        """Test removing every item leaves an exact zero total"""
+        cart = Cart(user_id='user1')
+        cart.add_item(Item(item_id='1', name='A', price=0.1, quantity=1))
+        cart.add_item(Item(item_id='2', name='B', price=0.2, quantity=1))
+        
+        cart.remove_item('1')
+        cart.remove_item('2')
+        
+        self.assertEqual(cart.get_total(), 0.0)
+        self.assertEqual(cart.get_item_count(), 0)
+    
     def test_discount_code_validation(self):
         """Test discount code validation"""
         discount_code = DiscountCode(code='TEST10', discount_percentage=10.0)
@@ -397,7 +535,7 @@ class ModelsTestCase(unittest.TestCase):
     
     def test_discount_code_expiry(self):
         """Test discount code expiry"""
-        past_date = datetime.utcnow() - timedelta(days=1)
+        past_date = time.time_ns() - NANOSECONDS_PER_DAY
         discount_code = DiscountCode(
             code='EXPIRED',
             discount_percentage=10.0,
@@ -413,11 +551,33 @@ class ModelsTestCase(unittest.TestCase):
             order_id='order1',
             user_id='user1',
             items=items,
-            subtotal=20.0,
-            discount_amount=2.0
+            subtotal_cents=2000,
+            discount_amount_cents=200
         )
         
         self.assertEqual(order.total_amount, 18.0)
+        self.assertEqual(order.total_amount_cents, 1800)
+    
+    def test_request_time_snapshot(self):
+        """Test models share the pinned request time"""
+        token = set_request_time(1_000_000_000)
+        try:
+            cart = Cart(user_id='user1')
+            order = Order(order_id='order1', user_id='user1', items=[], subtotal_cents=0)
+        finally:
+            reset_request_time(token)
+        
+        self.assertEqual(cart.created_at, 1_000_000_000)
+        self.assertEqual(order.created_at, 1_000_000_000)
+        self.assertGreater(Cart(user_id='user2').created_at, 1_000_000_000)
+    
+    def test_store_instance_is_shared(self):
+        """Test the shared store is created once and reused"""
+        from app import store
+        
+        self.assertIs(InMemoryStore.instance(), InMemoryStore.instance())
+        self.assertIs(InMemoryStore.instance(), store)
+        self.assertIsNot(InMemoryStore(), store)
 
 
 class ServicesTestCase(unittest.TestCase):
@@ -440,6 +600,20 @@ class ServicesTestCase(unittest.TestCase):
         self.assertEqual(len(cart.items), 1)
         self.assertEqual(cart.get_total(), 20.0)
     
+    def test_cart_service_remove_item(self):
+        """Test removing an item updates cart totals"""
+        self.cart_service.add_item_to_cart('user1', Item(item_id='1', name='A', price=10.0, quantity=2))
+        self.cart_service.add_item_to_cart('user1', Item(item_id='2', name='B', price=5.0, quantity=1))
+        
+        cart = self.cart_service.remove_item_from_cart('user1', '1')
+        
+        self.assertEqual(len(cart.items), 1)
+        self.assertEqual(cart.get_total(), 5.0)
+        self.assertEqual(cart.get_item_count(), 1)
+        
+        with self.assertRaises(ValueError):
+            self.cart_service.remove_item_from_cart('user1', '1')
+    
     def test_order_service_create_order(self):
         """Test order service create order functionality"""
         # Create cart with items
@@ -454,6 +628,32 @@ class ServicesTestCase(unittest.TestCase):
         self.assertEqual(order.subtotal, 100.0)
         self.assertEqual(order.total_amount, 100.0)
         self.assertEqual(len(order.items), 1)
+        self.assertEqual(order.item_count, 1)
+        self.assertEqual(cart.items, [])
+        self.assertEqual(cart.get_total(), 0.0)
+    
+    def test_order_items_are_snapshots(self):
+        """Test order items do not change when the cart changes"""
+        cart = Cart(user_id='user1')
+        cart.add_item(Item(item_id='1', name='Test', price=10.0, quantity=1))
+        
+        order = self.order_service.create_order(cart)
+        cart.add_item(Item(item_id='1', name='Test', price=10.0, quantity=4))
+        
+        self.assertIsInstance(order.items[0], OrderItem)
+        self.assertEqual(order.items[0].quantity, 1)
+        self.assertEqual(order.items[0].subtotal, 10.0)
+    
+    def test_order_service_get_user_orders(self):
+        """Test fetching orders for a single user"""
+        for user_id in ('user1', 'user2', 'user1'):
+            cart = Cart(user_id=user_id)
+            cart.add_item(Item(item_id='1', name='Test', price=10.0, quantity=1))
+            self.order_service.create_order(cart)
+        
+        self.assertEqual(len(self.order_service.get_user_orders('user1')), 2)
+        self.assertEqual(len(self.order_service.get_user_orders('user2')), 1)
+        self.assertEqual(self.order_service.get_user_orders('user3'), [])
     
     def test_order_service_create_order_with_discount(self):
         """Test creating order with discount code"""
@@ -471,6 +671,14 @@ class ServicesTestCase(unittest.TestCase):
         self.assertEqual(order.discount_amount, 10.0)
         self.assertEqual(order.total_amount, 90.0)
         self.assertEqual(order.discount_code, discount_code.code)
+        self.assertTrue(discount_code.is_used)
+        
+        # A second order cannot reuse the code and leaves its cart untouched
+        cart = Cart(user_id='user2')
+        cart.add_item(Item(item_id='1', name='Test', price=100.0, quantity=1))
+        with self.assertRaises(ValueError):
+            self.order_service.create_order(cart, discount_code.code)
+        self.assertEqual(cart.get_item_count(), 1)
     
     def test_discount_service_generate_code(self):
         """Test discount service generate code functionality"""
@@ -490,6 +698,24 @@ class ServicesTestCase(unittest.TestCase):
         
         self.assertFalse(self.discount_service.is_discount_code_valid(discount_code.code))
     
+    def test_discount_service_has_unused_code(self):
+        """Test unused code tracking follows generation and use"""
+        self.assertFalse(self.discount_service.has_unused_discount_code())
+        
+        discount_code = self.discount_service.generate_discount_code()
+        self.assertTrue(self.discount_service.has_unused_discount_code())
+        
+        self.discount_service.use_discount_code(discount_code.code)
+        self.assertFalse(self.discount_service.has_unused_discount_code())
+        self.assertEqual(self.store.get_unused_discount_codes(), [])
+    
+    def test_discount_service_available_codes_in_creation_order(self):
+        """Test available discount codes are listed in creation order"""
+        codes = [self.discount_service.generate_discount_code().code for _ in range(5)]
+        
+        available = self.discount_service.get_available_discount_codes()
+        self.assertEqual([dc.code for dc in available], codes)
+    
     def test_admin_service_statistics(self):
         """Test admin service statistics"""
         # Create some test data
@@ -506,6 +732,69 @@ class ServicesTestCase(unittest.TestCase):
         self.assertEqual(stats['orders']['total_items_purchased'], 2)
         self.assertEqual(stats['orders']['total_purchase_amount'], 200.0)
         self.assertEqual(stats['discounts']['total_discount_codes'], 1)
+    
+    def test_admin_service_statistics_cached_until_change(self):
+        """Test statistics are reused until an order or discount code changes"""
+        stats = self.admin_service.get_store_statistics()
+        self.assertIs(self.admin_service.get_store_statistics(), stats)
+        
+        cart = Cart(user_id='user1')
+        cart.add_item(Item(item_id='1', name='Test', price=50.0, quantity=1))
+        self.order_service.create_order(cart)
+        
+        stats = self.admin_service.get_store_statistics()
+        self.assertEqual(stats['orders']['total_orders'], 1)
+        
+        discount_code = self.discount_service.generate_discount_code()
+        stats = self.admin_service.get_store_statistics()
+        self.assertEqual(stats['discounts']['available_discount_codes'], 1)
+        
+        self.discount_service.use_discount_code(discount_code.code)
+        stats = self.admin_service.get_store_statistics()
+        self.assertEqual(stats['discounts']['used_discount_codes'], 1)
+        self.assertEqual(stats['discounts']['available_discount_codes'], 0)
+
+
+class ValidatorsTestCase(unittest.TestCase):
+    """Test case for request validators"""
+    
+    def test_add_item_rejects_boolean_numbers(self):
+        """Test booleans are rejected for price and quantity"""
+        item_data = {'item_id': 'item1', 'name': 'Test Product', 'price': True, 'quantity': 1}
+        self.assertEqual(validate_add_item_request(item_data), "price must be a non-negative number")
+        
+        item_data = {'item_id': 'item1', 'name': 'Test Product', 'price': 1, 'quantity': True}
+        self.assertEqual(validate_add_item_request(item_data), "quantity must be a positive integer")
+    
+    def test_pagination_params_defaults(self):
+        """Test omitted pagination params fall back to defaults"""
+        self.assertEqual(validate_pagination_params(None, None), (None, 1, 10))
+        self.assertEqual(validate_pagination_params('', ''), (None, 1, 10))
+        self.assertEqual(validate_pagination_params('3', '50'), (None, 3, 50))
+    
+    def test_pagination_params_out_of_range(self):
+        """Test zero and out-of-range pagination params are rejected"""
+        self.assertEqual(validate_pagination_params('0', '10'),
+                         ("page must be a positive integer", 1, 10))
+        self.assertEqual(validate_pagination_params('1', '0'),
+                         ("per_page must be between 1 and 100", 1, 10))
+        self.assertEqual(validate_pagination_params('1', '101'),
+                         ("per_page must be between 1 and 100", 1, 10))
+    
+    def test_pagination_params_signed_or_padded(self):
+        """Test signed and padded pagination params are parse errors"""
+        for page, per_page in (('-1', '10'), ('+1', '10'), (' 5', '10'), ('1', '10 '), ('x', '10')):
+            self.assertEqual(validate_pagination_params(page, per_page),
+                             ("page and per_page must be valid integers", 1, 10))
+    
+    def test_pagination_ints(self):
+        """Test range checks on pre-parsed pagination params"""
+        self.assertEqual(validate_pagination_ints(), (None, 1, 10))
+        self.assertEqual(validate_pagination_ints(2, 100), (None, 2, 100))
+        self.assertEqual(validate_pagination_ints(0, 10), ("page must be a positive integer", 1, 10))
+        self.assertEqual(validate_pagination_ints(-1, 10), ("page must be a positive integer", 1, 10))
+        self.assertEqual(validate_pagination_ints(1, 0), ("per_page must be between 1 and 100", 1, 10))
+        self.assertEqual(validate_pagination_ints(1, 101), ("per_page must be between 1 and 100", 1, 10))
 
 
 if __name__ == '__main__':
@@ -3,10 +3,37 @@ Request validation utilities for the e-commerce API
 Contains functions to validate incoming request data
 """
 
-from typing import Optional, Dict, Any
+from typing import Any, Callable
 
 
-def validate_add_item_request(data: Optional[Dict[str, Any]]) -> Optional[str]:
+# Field sets are built once at import instead of on every request
+_ALLOWED_CHECKOUT: frozenset[str] = frozenset(('discount_code',))
+
+# Pagination error results are immutable, so one shared tuple serves every call
+_ERR_PAGE = ("page must be a positive integer", 1, 10)
+_ERR_PER_PAGE = ("per_page must be between 1 and 100", 1, 10)
+_ERR_PARSE = ("page and per_page must be valid integers", 1, 10)
+
+
+def _nonempty_str(value: object) -> bool:
+    """Check that a value is a string with a non-whitespace character, without copying it"""
+    return type(value) is str and bool(value) and not value.isspace()
+
+
+# (field, exact accepted types, value predicate, error message) for add item
+# requests. JSON decoding never produces subclasses, so types are compared
+# exactly; this also keeps bool out of the int fields.
+_ADD_ITEM_CHECKS: tuple[tuple[str, tuple[type, ...], Callable[[Any], object], str], ...] = (
+    ('item_id', (str,), _nonempty_str, "item_id must be a non-empty string"),
+    ('name', (str,), _nonempty_str, "name must be a non-empty string"),
+    ('price', (int, float), lambda v: v >= 0, "price must be a non-negative number"),
+    ('quantity', (int,), lambda v: v > 0, "quantity must be a positive integer"),
+)
+_MISSING_FIELD_MSG: dict[str, str] = {field: f"Missing required field: {field}" for field, *_ in _ADD_ITEM_CHECKS}
+_MISSING = object()
+
+
+def validate_add_item_request(data: dict[str, object] | None) -> str | None:
     """
     Validate add item to cart request data
     
@@ -16,32 +43,48 @@ def validate_add_item_request(data: Optional[Dict[str, Any]]) -> Optional[str]:
     Returns:
         Error message if validation fails, None if valid
     """
+    # Fast path: a well-formed request matches in one pattern. The types are
+    # fixed by the pattern, so the value checks are OR-ed into a single test
+    # with | and the guard branches once.
+    match data:
+        case {'item_id': str() as item_id, 'name': str() as name,
+              'price': (int() | float()) as price, 'quantity': int() as quantity} if not (
+                  (not item_id) | item_id.isspace() | (not name) | name.isspace()
+                  | (type(price) is bool) | (not price >= 0)
+                  | (type(quantity) is bool) | (quantity <= 0)):
+            return None
+    
+    return _diagnose_add_item(data)
+
+
+def _diagnose_add_item(data: dict[str, object] | None) -> str | None:
+    """Find the first problem with an add item request that failed the fast path"""
     if not data:
         return "Request body is required"
     
-    # Required fields
-    required_fields = ['item_id', 'name', 'price', 'quantity']
-    for field in required_fields:
-        if field not in data:
-            return f"Missing required field: {field}"
+    if type(data) is not dict:
+        return "Request body must be a JSON object"
     
-    # Validate field types and values
-    if not isinstance(data['item_id'], str) or not data['item_id'].strip():
-        return "item_id must be a non-empty string"
+    # Look each required field up once; a sentinel keeps an explicit null
+    # distinct from a missing field. Missing fields are reported before any
+    # type error, in table order.
+    get = data.get
+    values = []
+    for field, *_ in _ADD_ITEM_CHECKS:
+        value = get(field, _MISSING)
+        if value is _MISSING:
+            return _MISSING_FIELD_MSG[field]
+        values.append(value)
     
-    if not isinstance(data['name'], str) or not data['name'].strip():
-        return "name must be a non-empty string"
-    
-    if not isinstance(data['price'], (int, float)) or data['price'] < 0:
-        return "price must be a non-negative number"
-    
-    if not isinstance(data['quantity'], int) or data['quantity'] <= 0:
-        return "quantity must be a positive integer"
+    # Validate field types and values
+    for value, (_, types, predicate, message) in zip(values, _ADD_ITEM_CHECKS):
+        if type(value) not in types or not predicate(value):
+            return message
     
     return None
 
 
-def validate_checkout_request(data: Optional[Dict[str, Any]]) -> Optional[str]:
+def validate_checkout_request(data: dict[str, object] | None) -> str | None:
     """
     Validate checkout request data
     
@@ -55,21 +98,24 @@ def validate_checkout_request(data: Optional[Dict[str, Any]]) -> Optional[str]:
     if data is None:
         return None
     
+    if type(data) is not dict:
+        return "Request body must be a JSON object"
+    
     # If data is provided, validate discount_code if present
     if 'discount_code' in data:
-        if not isinstance(data['discount_code'], str) or not data['discount_code'].strip():
+        if not _nonempty_str(data['discount_code']):
             return "discount_code must be a non-empty string"
     
     # Check for unexpected fields
-    allowed_fields = ['discount_code']
-    for field in data:
-        if field not in allowed_fields:
-            return f"Unexpected field: {field}"
+    extra = data.keys() - _ALLOWED_CHECKOUT
+    if extra:
+        field = next(f for f in data if f in extra)
+        return "Unexpected field: " + field
     
     return None
 
 
-def validate_user_id(user_id: str) -> Optional[str]:
+def validate_user_id(user_id: str) -> str | None:
     """
     Validate user ID parameter
     
@@ -79,17 +125,31 @@ def validate_user_id(user_id: str) -> Optional[str]:
     Returns:
         Error message if validation fails, None if valid
     """
-    if not user_id or not user_id.strip():
-        return "user_id cannot be empty"
-    
-    # Basic validation - can be extended for specific format requirements
-    if len(user_id.strip()) < 1:
-        return "user_id must be at least 1 character long"
+    return None if _nonempty_str(user_id) else "user_id cannot be empty"
+
+
+def _pos_int(value: str | None, default: int) -> int:
+    """
+    Parse an optional non-negative integer query parameter
     
-    return None
+    Args:
+        value: Raw parameter value, or None/empty when omitted
+        default: Value to use when the parameter is omitted
+        
+    Returns:
+        Parsed integer
+        
+    Raises:
+        ValueError: If the value is not a plain run of digits
+    """
+    if not value:
+        return default
+    if not value.isdigit():
+        raise ValueError(value)
+    return int(value)
 
 
-def validate_pagination_params(page: Optional[str], per_page: Optional[str]) -> tuple[Optional[str], int, int]:
+def validate_pagination_params(page: str | None, per_page: str | None) -> tuple[str | None, int, int]:
     """
     Validate pagination parameters
     
@@ -101,16 +161,29 @@ def validate_pagination_params(page: Optional[str], per_page: Optional[str]) ->
         Tuple of (error_message, page_int, per_page_int)
     """
     try:
-        page_int = int(page) if page else 1
-        per_page_int = int(per_page) if per_page else 10
-        
-        if page_int < 1:
-            return "page must be a positive integer", 1, 10
-        
-        if per_page_int < 1 or per_page_int > 100:
-            return "per_page must be between 1 and 100", 1, 10
-        
-        return None, page_int, per_page_int
-        
+        page_int = _pos_int(page, 1)
+        per_page_int = _pos_int(per_page, 10)
     except ValueError:
-        return "page and per_page must be valid integers", 1, 10
\ No newline at end of file
+        return _ERR_PARSE
+    
+    return validate_pagination_ints(page_int, per_page_int)
+
+
+def validate_pagination_ints(page: int = 1, per_page: int = 10) -> tuple[str | None, int, int]:
+    """
+    Validate pagination parameters that were already parsed as integers
+    
+    Args:
+        page: Page number, e.g. from request.args.get('page', 1, type=int)
+        per_page: Items per page
+        
+    Returns:
+        Tuple of (error_message, page_int, per_page_int)
+    """
+    if page < 1:
+        return _ERR_PAGE
+    
+    if per_page < 1 or per_page > 100:
+        return _ERR_PER_PAGE
+    
+    return None, page, per_page